@@ -1,11 +1,19 @@
+import base64
+import datetime
+import functools
+import glob
+import io
 import json
 import os
-import plistlib
+import pathlib
 import re
 import sys
+import zipfile
 from dataclasses import dataclass
 from typing import Optional
 
+from lxml import etree
+
 
 @dataclass
 class Product:
@@ -20,6 +28,82 @@ class Product:
         return self.display_name if self.display_name else self.folder_name
 
 
+VERSION_PATTERN = re.compile(r'v(.*)')
+
+PLIST_DOCTYPE = '<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" ' \
+                '"http://www.apple.com/DTDs/PropertyList-1.0.dtd">'
+
+
+def plist_load(path: str):
+    with open(path, 'rb') as fp:
+        root = etree.parse(fp).getroot()
+    return parse_plist_node(root[0])
+
+
+def parse_plist_node(node):
+    tag = node.tag
+    if tag == 'dict':
+        children = iter(node)
+        return {key.text: parse_plist_node(value) for key, value in zip(children, children)}
+    if tag == 'array':
+        return [parse_plist_node(child) for child in node]
+    if tag == 'string':
+        return node.text or ''
+    if tag == 'integer':
+        return int(node.text)
+    if tag == 'real':
+        return float(node.text)
+    if tag == 'true':
+        return True
+    if tag == 'false':
+        return False
+    if tag == 'data':
+        return base64.b64decode(node.text or '')
+    if tag == 'date':
+        return datetime.datetime.strptime(node.text, '%Y-%m-%dT%H:%M:%SZ')
+    raise ValueError(f'Unsupported plist tag <{tag}>')
+
+
+def plist_dump(value, fp) -> None:
+    with etree.xmlfile(fp, encoding='UTF-8') as xf:
+        xf.write_declaration()
+        xf.write_doctype(PLIST_DOCTYPE)
+        with xf.element('plist', version='1.0'):
+            write_plist_node(xf, value)
+
+
+def write_plist_node(xf, value) -> None:
+    if isinstance(value, dict):
+        with xf.element('dict'):
+            for key in sorted(value):
+                xf.write(text_element('key', key))
+                write_plist_node(xf, value[key])
+    elif isinstance(value, (list, tuple)):
+        with xf.element('array'):
+            for item in value:
+                write_plist_node(xf, item)
+    elif isinstance(value, str):
+        xf.write(text_element('string', value))
+    elif isinstance(value, bool):
+        xf.write(etree.Element('true' if value else 'false'))
+    elif isinstance(value, int):
+        xf.write(text_element('integer', str(value)))
+    elif isinstance(value, float):
+        xf.write(text_element('real', repr(value)))
+    elif isinstance(value, bytes):
+        xf.write(text_element('data', base64.b64encode(value).decode('ascii')))
+    elif isinstance(value, datetime.datetime):
+        xf.write(text_element('date', value.strftime('%Y-%m-%dT%H:%M:%SZ')))
+    else:
+        raise TypeError(f'Unsupported plist value type {type(value)}')
+
+
+def text_element(tag: str, text: str):
+    element = etree.Element(tag)
+    element.text = text
+    return element
+
+
 def create_connection(destination_uid: str) -> list[dict]:
     return [{'destinationuid': destination_uid,
              'modifiers': 0,
@@ -27,31 +111,35 @@ def create_connection(destination_uid: str) -> list[dict]:
              'vitoclose': False}]
 
 
+SCRIPT_FILTER_TEMPLATE = {
+    'config': {'alfredfiltersresults': False,
+               'alfredfiltersresultsmatchmode': 0,
+               'argumenttreatemptyqueryasnil': False,
+               'argumenttrimmode': 0,
+               'argumenttype': 1,
+               'escaping': 102,
+               'queuedelaycustom': 3,
+               'queuedelayimmediatelyinitially': True,
+               'queuedelaymode': 0,
+               'queuemode': 1,
+               'runningsubtext': '',
+               'scriptargtype': 1,
+               'scriptfile': '',
+               'subtext': '',
+               'skipuniversalaction': True,
+               'type': 0,
+               'withspace': True},
+    'type': 'alfred.workflow.input.scriptfilter',
+    'version': 3}
+
+
 def create_script_filter(product: Product) -> dict:
-    return {
-        'config': {'alfredfiltersresults': False,
-                   'alfredfiltersresultsmatchmode': 0,
-                   'argumenttreatemptyqueryasnil': False,
-                   'argumenttrimmode': 0,
-                   'argumenttype': 1,
-                   'escaping': 102,
-                   'keyword': f'{{var:{product.keyword}}}',
-                   'queuedelaycustom': 3,
-                   'queuedelayimmediatelyinitially': True,
-                   'queuedelaymode': 0,
-                   'queuemode': 1,
-                   'runningsubtext': '',
-                   'script': f'/usr/bin/python3 recent_projects.py "{product.keyword}" "${{1}}"',
-                   'scriptargtype': 1,
-                   'scriptfile': '',
-                   'subtext': '',
-                   'skipuniversalaction': True,
-                   'title': f'Search through your recent {product.name()} projects',
-                   'type': 0,
-                   'withspace': True},
-        'type': 'alfred.workflow.input.scriptfilter',
-        'uid': product.uid,
-        'version': 3}
+    return {**SCRIPT_FILTER_TEMPLATE,
+            'config': {**SCRIPT_FILTER_TEMPLATE['config'],
+                       'keyword': f'{{var:{product.keyword}}}',
+                       'script': f'/usr/bin/python3 recent_projects.py "{product.keyword}" "${{1}}"',
+                       'title': f'Search through your recent {product.name()} projects'},
+            'uid': product.uid}
 
 
 def create_userconfigurationconfig(product: Product) -> dict:
@@ -87,58 +175,71 @@ def build():
     # Collect info
     products = get_products()
 
-    with open('alfred/template.plist', 'rb') as fp:
-        plist = plistlib.load(fp)
+    plist = plist_load('alfred/template.plist')
 
     version = sys.argv[1] if len(sys.argv) > 1 else "unknown"
-    version = re.sub(r'v(.*)', r'\1', version)
+    version = VERSION_PATTERN.sub(r'\1', version)
 
     # Modify plist
     # Get the UID of the runscript action in the template
     run_script_uid = get_run_script_uid(plist)
     run_script_connection = create_connection(run_script_uid)
 
-    plist["connections"].update({product.uid: run_script_connection for product in products})
-
     y_coordinate_ruler = create_coordinate_ruler(len(products))
-    plist["uidata"].update(
-        {product.uid: create_coordinates(30, coord) for product, coord in zip(products, y_coordinate_ruler)})
+    for product, y_coordinate in zip(products, y_coordinate_ruler):
+        plist["connections"][product.uid] = run_script_connection
+        plist["uidata"][product.uid] = create_coordinates(30, y_coordinate)
+        plist["objects"].append(create_script_filter(product))
+        plist["userconfigurationconfig"].append(create_userconfigurationconfig(product))
 
     plist["uidata"][run_script_uid]["ypos"] = sum(y_coordinate_ruler) / len(y_coordinate_ruler)
 
-    plist["objects"].extend([create_script_filter(product) for product in products])
-
-    plist["userconfigurationconfig"].extend([create_userconfigurationconfig(product) for product in products])
-
     plist["version"] = version
 
-    with open(".readme/embedded-readme.md", 'r', encoding='utf-8') as file:
-        plist["readme"] = file.read()
+    plist["readme"] = read_embedded_readme()
 
     # Output
     print(f"Building {[product.name() for product in products]}")
-    os.system(f'mkdir -p out')
+    os.makedirs('out', exist_ok=True)
+
+    plist_buffer = io.BytesIO()
+    plist_dump(plist, plist_buffer)
+    plist_bytes = plist_buffer.getvalue()
 
     with open('out/info.plist', 'wb') as fp:
-        plistlib.dump(plist, fp)
+        fp.write(plist_bytes)
+
+    with zipfile.ZipFile('alfred-jetbrains-projects.alfredworkflow', 'w', zipfile.ZIP_DEFLATED) as workflow:
+        workflow.writestr('info.plist', plist_bytes)
+        for product in products:
+            with open(f'icons/{product.keyword}.png', 'rb') as fp:
+                icon = fp.read()
+            with open(f'out/{product.uid}.png', 'wb') as fp:
+                fp.write(icon)
+            workflow.writestr(f'{product.uid}.png', icon)
+        for path in ('recent_projects.py', 'products.json', 'icon.png'):
+            workflow.write(path, path)
+
+
+@functools.lru_cache(maxsize=1)
+def read_products_file() -> dict:
+    with open('products.json', 'rb') as fp:
+        return json.loads(fp.read())
 
-    for product in products:
-        os.system(f'cp icons/{product.keyword}.png ./out/{product.uid}.png')
 
-    os.system(
-        f'zip -j -r alfred-jetbrains-projects.alfredworkflow out/* recent_projects.py products.json icon.png')
+@functools.lru_cache(maxsize=1)
+def read_embedded_readme() -> str:
+    with open('.readme/embedded-readme.md', 'rb') as fp:
+        return fp.read().decode('utf-8')
 
 
 def get_products() -> list[Product]:
-    with open('products.json', 'r') as outfile:
-        js = json.load(outfile)
-        products = [Product(k, **v) for k, v in js.items()]
-    return products
+    return [Product(k, **v) for k, v in read_products_file().items()]
 
 
 def clean():
-    os.system("rm out/*")
-    os.system("rm *.alfredworkflow")
+    for path in glob.glob('out/*') + glob.glob('*.alfredworkflow'):
+        pathlib.Path(path).unlink(missing_ok=True)
 
 
 def main():
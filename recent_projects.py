@@ -1,11 +1,22 @@
 #!/usr/bin/env python3
 
+import functools
 import json
 import os
+import re
 import sys
-from xml.etree import ElementTree
 
-BREAK_CHARACTERS = ["_", "-"]
+try:
+    import orjson
+except ImportError:
+    # The stock /usr/bin/python3 this workflow runs under has no third-party packages.
+    orjson = None
+
+ABBREVIATION_PATTERN = re.compile(r"[_\-]+([^_\-])")
+
+
+class WorkflowError(Exception):
+    pass
 
 
 class AlfredItem:
@@ -15,34 +26,64 @@ class AlfredItem:
         self.arg = arg
         self.type = type
 
+    def to_dict(self):
+        return {"title": self.title, "subtitle": self.subtitle, "arg": self.arg, "type": self.type}
+
 
 class AlfredOutput:
     def __init__(self, items, bundle_id):
         self.variables = {"bundle_id": bundle_id}
         self.items = items
 
-
-class CustomEncoder(json.JSONEncoder):
-    def default(self, obj):
-        return obj.__dict__
+    def to_dict(self):
+        return {"variables": self.variables, "items": [item.to_dict() for item in self.items]}
 
 
 def create_json(projects, bundle_id):
-    return CustomEncoder().encode(
-        AlfredOutput([AlfredItem(project.name, project.path, project.path) for project in projects], bundle_id))
+    output = AlfredOutput(
+        [AlfredItem(project.name, project.path, project.path) for project in projects], bundle_id).to_dict()
+    if orjson is not None:
+        return orjson.dumps(output).decode("utf-8")
+    return json.dumps(output)
+
+
+def read_project_name(path):
+    # os.path.expanduser() is needed to open the file, but Alfred can handle the `~` shorthand in the returned JSON.
+    try:
+        with open(os.path.expanduser(path) + "/.idea/.name") as name_file:
+            return name_file.read()
+    except OSError:
+        return path.split('/')[-1]
 
 
 class Project:
     def __init__(self, path):
         self.path = path
-        # os.path.expanduser() is needed for os.path.isfile(), but Alfred can handle the `~` shorthand in the returned JSON.
-        name_file = os.path.expanduser(self.path) + "/.idea/.name"
 
-        if os.path.isfile(name_file):
-            self.name = open(name_file).read()
-        else:
-            self.name = path.split('/')[-1]
-        self.abbreviation = self.abbreviate()
+    @functools.cached_property
+    def name(self):
+        return read_project_name(self.path)
+
+    @functools.cached_property
+    def abbreviation(self):
+        return self.abbreviate()
+
+    @functools.cached_property
+    def path_lower(self):
+        return self.path.lower()
+
+    @functools.cached_property
+    def name_lower(self):
+        return self.name.lower()
+
+    @functools.cached_property
+    def abbreviation_lower(self):
+        return self.abbreviation.lower()
+
+    @functools.cached_property
+    def search_haystack(self):
+        # A query never contains a newline, so it is a safe field separator.
+        return "\n".join((self.abbreviation_lower, self.name_lower))
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
@@ -50,19 +91,10 @@ class Project:
         return False
 
     def abbreviate(self):
-        previous_was_break = False
-        abbreviation = self.name[0]
-        for char in self.name[1: len(self.name)]:
-            if char in BREAK_CHARACTERS:
-                previous_was_break = True
-            else:
-                if previous_was_break:
-                    abbreviation += char
-                    previous_was_break = False
-        return abbreviation
+        return self.name[0] + ''.join(ABBREVIATION_PATTERN.findall(self.name[1:]))
 
     def matches_query(self, query):
-        return query in self.path.lower() or query in self.abbreviation.lower() or query in self.name.lower()
+        return query in self.path_lower or query in self.search_haystack
 
     def sort_on_match_type(self, query):
         if query == self.abbreviation:
@@ -72,22 +104,72 @@ class Project:
         return 2
 
 
+def create_error_json(message):
+    return json.dumps({"items": [{"title": message, "valid": False}]})
+
+
+@functools.lru_cache(maxsize=1)
+def read_products_file():
+    with open('products.json', 'r') as outfile:
+        return json.load(outfile)
+
+
 def find_app_data(app):
     try:
-        with open('products.json', 'r') as outfile:
-            data = json.load(outfile)
-            return data[app]
+        return read_products_file()[app]
     except IOError:
-        print("Can't open products file")
+        raise WorkflowError("Can't open products file")
     except KeyError:
-        print("App '{}' is not found in the products.json".format(app))
-    exit(1)
+        raise WorkflowError("App '{}' is not found in the products.json".format(app))
 
 
 def find_recentprojects_file(application):
     preferences_path = os.path.expanduser(preferences_path_or_default(application))
-    most_recent_preferences = max(find_preferences_folders(preferences_path, application))
-    return "{}{}/options/{}.xml".format(preferences_path, most_recent_preferences, "recentProjects")
+    location = cached_recentprojects_file(application, preferences_path)
+    if location is None:
+        most_recent_preferences = max(find_preferences_folders(preferences_path, application))
+        location = "{}{}/options/{}.xml".format(preferences_path, most_recent_preferences, "recentProjects")
+        store_recentprojects_file(application, preferences_path, location)
+    return location
+
+
+def location_cache_file():
+    # Alfred points alfred_workflow_cache at a per-workflow cache directory.
+    cache_dir = os.environ.get("alfred_workflow_cache")
+    return os.path.join(cache_dir, "recentprojects-location.json") if cache_dir else None
+
+
+def cached_recentprojects_file(application, preferences_path):
+    cache_file = location_cache_file()
+    if cache_file is None:
+        return None
+    try:
+        with open(cache_file) as fp:
+            entry = json.load(fp)[application["folder_name"]]
+        if entry["preferences_mtime"] == os.path.getmtime(preferences_path) and os.path.isfile(entry["location"]):
+            return entry["location"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def store_recentprojects_file(application, preferences_path, location):
+    cache_file = location_cache_file()
+    if cache_file is None:
+        return
+    try:
+        with open(cache_file) as fp:
+            cache = json.load(fp)
+    except (OSError, ValueError):
+        cache = {}
+    try:
+        cache[application["folder_name"]] = {"preferences_mtime": os.path.getmtime(preferences_path),
+                                             "location": location}
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, "w") as fp:
+            json.dump(cache, fp)
+    except OSError:
+        pass
 
 
 def preferences_path_or_default(application):
@@ -96,8 +178,10 @@ def preferences_path_or_default(application):
 
 
 def find_preferences_folders(preferences_path, application):
-    return [folder_name for folder_name in next(os.walk(preferences_path))[1] if
-            application["folder_name"] in folder_name and not should_ignore_folder(folder_name)]
+    folder_name = application["folder_name"]
+    with os.scandir(preferences_path) as entries:
+        yield from (entry.name for entry in entries if
+                    entry.is_dir() and folder_name in entry.name and not should_ignore_folder(entry.name))
 
 
 def should_ignore_folder(folder_name):
@@ -105,19 +189,104 @@ def should_ignore_folder(folder_name):
 
 
 def read_projects_from_file(most_recent_projects_file):
-    tree = ElementTree.parse(most_recent_projects_file)
-    projects = [t.attrib['key'].replace('$USER_HOME$', "~") for t
-                in tree.findall(".//component[@name='RecentProjectsManager']/option[@name='additionalInfo']/map/entry")
-                if t.find("value/RecentProjectMetaInfo[@hidden='true']") is None]
-    return reversed(projects)
+    # Imported here to keep interpreter startup lean; error paths and cached
+    # invocations never need the XML machinery.
+    from xml.etree import ElementTree
+
+    projects = []
+    # Number of currently open ancestors on the
+    # component[@name='RecentProjectsManager']/option[@name='additionalInfo'] path.
+    open_ancestors = 0
+    for event, element in ElementTree.iterparse(most_recent_projects_file, events=("start", "end")):
+        on_path = (element.tag == "component" and element.get("name") == "RecentProjectsManager") or \
+                  (element.tag == "option" and element.get("name") == "additionalInfo")
+        if event == "start":
+            open_ancestors += on_path
+        else:
+            open_ancestors -= on_path
+            if element.tag == "entry" and open_ancestors == 2:
+                if element.find("value/RecentProjectMetaInfo[@hidden='true']") is None:
+                    projects.append(element.attrib["key"].replace("$USER_HOME$", "~"))
+                element.clear()
+    # Most recent first, without handing back a reversed iterator that callers
+    # would have to copy into a list again.
+    projects.reverse()
+    return projects
+
+
+def prefetch_names(projects):
+    projects = list(projects)
+    if projects:
+        from concurrent.futures import ThreadPoolExecutor
+
+        # The .idea/.name reads are tiny and independent, so overlap their I/O.
+        # Call read_project_name directly and seed the cached_property slot:
+        # going through project.name here would serialize the reads behind the
+        # class-wide cached_property lock on Python <= 3.11 (gh-87634).
+        with ThreadPoolExecutor() as executor:
+            executor.map(lambda project: project.__dict__.setdefault("name", read_project_name(project.path)),
+                         projects)
+    return projects
+
+
+def read_projects(recent_projects_file):
+    paths = cached_project_paths(recent_projects_file)
+    if paths is None:
+        paths = read_projects_from_file(recent_projects_file)
+        store_project_paths(recent_projects_file, paths)
+    return paths
+
+
+def projects_cache_file():
+    cache_dir = os.environ.get("alfred_workflow_cache")
+    return os.path.join(cache_dir, "recentprojects-paths.json") if cache_dir else None
+
+
+def cached_project_paths(recent_projects_file):
+    cache_file = projects_cache_file()
+    if cache_file is None:
+        return None
+    try:
+        with open(cache_file) as fp:
+            entry = json.load(fp)[recent_projects_file]
+        if entry["mtime"] == os.path.getmtime(recent_projects_file):
+            return entry["paths"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def store_project_paths(recent_projects_file, paths):
+    cache_file = projects_cache_file()
+    if cache_file is None:
+        return
+    try:
+        with open(cache_file) as fp:
+            cache = json.load(fp)
+    except (OSError, ValueError):
+        cache = {}
+    try:
+        cache[recent_projects_file] = {"mtime": os.path.getmtime(recent_projects_file), "paths": paths}
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, "w") as fp:
+            json.dump(cache, fp)
+    except OSError:
+        pass
 
 
 def filter_and_sort_projects(query, projects):
-    if len(query) < 1:
+    if not query:
         return projects
-    results = [p for p in projects if p.matches_query(query)]
-    results.sort(key=lambda p: p.sort_on_match_type(query))
-    return results
+    # Decorate with (match type, original index) so one sorted() call both ranks
+    # the matches and keeps the recency order within each rank.
+    decorated = sorted((project.sort_on_match_type(query), index, project)
+                       for index, project in enumerate(projects) if project.matches_query(query))
+    return [project for _, _, project in decorated]
+
+
+def fail(message):  # pragma: nocover
+    sys.stdout.buffer.write(create_error_json(message).encode("utf-8"))
+    sys.exit(1)
 
 
 def main():  # pragma: nocover
@@ -127,19 +296,19 @@ def main():  # pragma: nocover
 
         query = sys.argv[2].strip().lower()
 
-        projects = list(map(Project, read_projects_from_file(recent_projects_file)))
-        projects = filter_and_sort_projects(query, projects)
+        projects = filter_and_sort_projects(
+            query, (Project(path) for path in read_projects(recent_projects_file)))
+        projects = prefetch_names(projects)
 
-        print(create_json(projects, app_data["bundle_id"]))
+        sys.stdout.buffer.write(create_json(projects, app_data["bundle_id"]).encode("utf-8"))
     except IndexError:
-        print("No app specified, exiting")
-        exit(1)
+        fail("No app specified, exiting")
     except ValueError:
-        print("Can't find any preferences for", sys.argv[1])
-        exit(1)
+        fail("Can't find any preferences for {}".format(sys.argv[1]))
     except FileNotFoundError:
-        print(f"The projects file for {sys.argv[1]} does not exist.")
-        exit(1)
+        fail(f"The projects file for {sys.argv[1]} does not exist.")
+    except WorkflowError as error:
+        fail(str(error))
 
 
 if __name__ == "__main__":  # pragma: nocover
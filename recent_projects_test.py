@@ -1,12 +1,17 @@
+import json
+import os
+import tempfile
 import unittest
 from unittest import mock
 
-from recent_projects import create_json, Project, find_app_data, find_recentprojects_file, read_projects_from_file, \
-    filter_and_sort_projects
+from recent_projects import create_json, Project, WorkflowError, find_app_data, \
+    find_recentprojects_file, read_products_file, read_projects, read_projects_from_file, \
+    filter_and_sort_projects, prefetch_names
 
 
 class Unittests(unittest.TestCase):
     def setUp(self):
+        read_products_file.cache_clear()
         self.recentProjectsPath = '/Users/JohnSnow/Library/Application Support' \
                                   '/JetBrains/IntelliJIdea2020.2/options/recentProjects.xml'
         self.example_projects_paths = ["~/Documents/spring-petclinic", "~/Desktop/trash/My Project (42)"]
@@ -15,28 +20,24 @@ class Unittests(unittest.TestCase):
             mock_expanduser.return_value = '/Users/JohnSnow/Documents/spring-petclinic'
             self.example_project = Project(self.example_projects_paths[0])
 
-    @mock.patch('os.path.isfile')
-    def test_create_json(self, mock_isfile):
-        mock_isfile.return_value = False
-        expected = '{"variables": {"bundle_id": "app_name"}, ' \
-                   '"items": [{"title": "spring-petclinic", ' \
-                   '"subtitle": "~/Documents/spring-petclinic", ' \
-                   '"arg": "~/Documents/spring-petclinic", ' \
-                   '"type": "file"}]}'
-        self.assertEqual(expected, create_json([self.example_project], "app_name"))
+    def test_create_json(self):
+        expected = {"variables": {"bundle_id": "app_name"},
+                    "items": [{"title": "spring-petclinic",
+                               "subtitle": "~/Documents/spring-petclinic",
+                               "arg": "~/Documents/spring-petclinic",
+                               "type": "file"}]}
+        self.assertEqual(expected, json.loads(create_json([self.example_project], "app_name")))
 
     @mock.patch("os.path.expanduser")
-    @mock.patch('os.path.isfile')
     @mock.patch("builtins.open", mock.mock_open(read_data="custom_project_name"))
-    def test_create_json_from_custom_name(self, mock_isfile, mock_expand_user):
+    def test_create_json_from_custom_name(self, mock_expand_user):
         mock_expand_user.return_value = '/Users/JohnSnow/Documents/spring-petclinic'
-        mock_isfile.return_value = True
-        expected = '{"variables": {"bundle_id": "app_name"}, ' \
-                   '"items": [{"title": "custom_project_name", ' \
-                   '"subtitle": "~/Documents/spring-petclinic", ' \
-                   '"arg": "~/Documents/spring-petclinic", ' \
-                   '"type": "file"}]}'
-        self.assertEqual(expected, create_json([Project("~/Documents/spring-petclinic")], "app_name"))
+        expected = {"variables": {"bundle_id": "app_name"},
+                    "items": [{"title": "custom_project_name",
+                               "subtitle": "~/Documents/spring-petclinic",
+                               "arg": "~/Documents/spring-petclinic",
+                               "type": "file"}]}
+        self.assertEqual(expected, json.loads(create_json([Project("~/Documents/spring-petclinic")], "app_name")))
 
     @mock.patch("builtins.open", mock.mock_open(read_data='{"clion": {"bundle_id": "com.jetbrains.clion", "folder_name": "CLion"}}'))
     def test_read_app_data(self):
@@ -45,48 +46,65 @@ class Unittests(unittest.TestCase):
             "bundle_id": "com.jetbrains.clion"
         })
 
-        with self.assertRaises(SystemExit) as exitcode:
+        with self.assertRaises(WorkflowError):
             find_app_data("rider")
-        self.assertEqual(exitcode.exception.code, 1)
 
     @mock.patch("builtins.open")
     def test_read_app_data_products_file_missing(self, mock_open):
         mock_open.side_effect = IOError()
-        with self.assertRaises(SystemExit) as exitcode:
+        with self.assertRaises(WorkflowError):
             find_app_data("clion")
-        self.assertEqual(exitcode.exception.code, 1)
+
+    @staticmethod
+    def mock_dir_entries(mock_scandir, *folder_names):
+        entries = []
+        for folder_name in folder_names:
+            entry = mock.Mock()
+            entry.name = folder_name
+            entry.is_dir.return_value = True
+            entries.append(entry)
+        mock_scandir.return_value.__enter__.return_value = iter(entries)
 
     @mock.patch("os.path.expanduser")
-    @mock.patch("os.walk")
-    def test_find_recent_files_xml(self, mock_walk, expand_user):
+    @mock.patch("os.scandir")
+    def test_find_recent_files_xml(self, mock_scandir, expand_user):
         expand_user.return_value = '/Users/JohnSnow/Library/Application Support/JetBrains/'
-        mock_walk.return_value = iter([
-            ('/Path',
-             ['IntelliJIdea2020.1',
-              'IntelliJIdea2020.2',
-              'IntelliJIdea2020.2-backup',
-              'GoLand2020.1',
-              'GoLand2020.2'], []),
-        ])
+        self.mock_dir_entries(mock_scandir,
+                              'IntelliJIdea2020.1',
+                              'IntelliJIdea2020.2',
+                              'IntelliJIdea2020.2-backup',
+                              'GoLand2020.1',
+                              'GoLand2020.2')
         """Happy Flow"""
         self.assertEqual(find_recentprojects_file({"folder_name": "IntelliJIdea"}),
                          self.recentProjectsPath)
 
     @mock.patch("os.path.expanduser")
-    @mock.patch("os.walk")
-    def test_find_recent_files_xml_android_studio(self, mock_walk, expand_user):
+    @mock.patch("os.scandir")
+    def test_find_recent_files_xml_android_studio(self, mock_scandir, expand_user):
         expand_user.return_value = '/Users/JohnSnow/Library/Application Support/Google/'
-        mock_walk.return_value = iter([
-            ('/Path',
-             ['AndroidStudio4.0',
-              'AndroidStudio4.1',
-              'Chrome'], []),
-        ])
+        self.mock_dir_entries(mock_scandir,
+                              'AndroidStudio4.0',
+                              'AndroidStudio4.1',
+                              'Chrome')
         """Happy Flow"""
         self.assertEqual(
             find_recentprojects_file({"folder_name": "AndroidStudio"}),
             '/Users/JohnSnow/Library/Application Support/Google/AndroidStudio4.1/options/recentProjects.xml')
 
+    def test_find_recent_files_xml_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            preferences_path = os.path.join(tmp, "JetBrains") + "/"
+            os.makedirs(os.path.join(preferences_path, "IntelliJIdea2020.2/options"))
+            location = os.path.join(preferences_path, "IntelliJIdea2020.2/options/recentProjects.xml")
+            open(location, "w").close()
+            application = {"folder_name": "IntelliJIdea", "preferences_path": preferences_path}
+            with mock.patch.dict(os.environ, {"alfred_workflow_cache": os.path.join(tmp, "cache")}):
+                self.assertEqual(find_recentprojects_file(application), location)
+                with mock.patch("os.scandir") as mock_scandir:
+                    self.assertEqual(find_recentprojects_file(application), location)
+                    mock_scandir.assert_not_called()
+
     @mock.patch("builtins.open", mock.mock_open(
         read_data='<application>'
                   '<component name="RecentProjectsManager">'
@@ -106,6 +124,26 @@ class Unittests(unittest.TestCase):
     def test_read_projects(self):
         self.assertEqual(list(read_projects_from_file(self.recentProjectsPath)), self.example_projects_paths)
 
+    def test_read_projects_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            xml_file = os.path.join(tmp, "recentProjects.xml")
+            with open(xml_file, "w") as fp:
+                fp.write('<application>'
+                         '<component name="RecentProjectsManager">'
+                         '<option name="additionalInfo">'
+                         '<map>'
+                         '<entry key="$USER_HOME$/Desktop/trash/My Project (42)" />'
+                         '<entry key="$USER_HOME$/Documents/spring-petclinic" />'
+                         '</map>'
+                         '</option>'
+                         '</component>'
+                         '</application>')
+            with mock.patch.dict(os.environ, {"alfred_workflow_cache": os.path.join(tmp, "cache")}):
+                self.assertEqual(read_projects(xml_file), self.example_projects_paths)
+                with mock.patch("recent_projects.read_projects_from_file") as mock_read:
+                    self.assertEqual(read_projects(xml_file), self.example_projects_paths)
+                    mock_read.assert_not_called()
+
     def test_filter_projects(self):
         projects = list(map(Project, self.example_projects_paths))
         self.assertEqual([Project(self.example_projects_paths[0])], filter_and_sort_projects("petclinic", projects))
@@ -114,6 +152,10 @@ class Unittests(unittest.TestCase):
         projects = list(map(Project, self.example_projects_paths))
         self.assertEqual(filter_and_sort_projects("", projects), projects)
 
+    def test_prefetch_names(self):
+        projects = prefetch_names(Project(path) for path in self.example_projects_paths)
+        self.assertEqual([project.name for project in projects], ["spring-petclinic", "My Project (42)"])
+
     def test_project_equals(self):
         project = Project(self.example_projects_paths[0])
         self.assertTrue(project == Project("~/Documents/spring-petclinic"))